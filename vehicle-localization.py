@@ -4,6 +4,9 @@ vehicle-localization.py
 
 This Python script implements the equations for an autonomous car and uses pygame to visualize an animation.
 
+For the best frame rate run it with 'python3 -O vehicle-localization.py ...' so the interpreter skips its debug
+checks; all surfaces are converted to the display pixel format at load time for the fast blit path.
+
 Author: Miguel Angel Muñoz Rizo
 
 Institution: Universidad de Monterrey
@@ -18,16 +21,39 @@ from math import sin, cos, atan2, tan, pi
 
 # Import useful libraries
 import pygame
-from numpy import deg2rad, rad2deg
-
-# Initialize pygame and constants
-pygame.init()
-FONT = pygame.font.Font(None, 20)
 
-# Create a window
+# Window size
 WIDTH, HEIGHT = 600, 600
-WINDOW = pygame.display.set_mode((WIDTH, HEIGHT))
-pygame.display.set_caption("Ackerman Steering Simulator | Advanced Robotics")
+
+# These globals are created by _init_display(); keeping them out of import time means argparse --help and
+# headless imports (e.g. for Fleet batch runs) never initialize SDL or open a window
+FONT = None
+WINDOW = None
+CAR_IMAGE = None
+
+
+def _init_display():
+    """
+    This function initializes pygame, creates the window and preloads the shared image asset. It is called from
+    main() so that importing the module does not open a window as a side effect.
+    :return: None
+    """
+    global FONT, WINDOW, CAR_IMAGE
+    pygame.init()
+    FONT = pygame.font.Font(None, 20)
+    # Create a window (double buffered and scaled so SDL can present frames through the GPU instead of a CPU copy)
+    WINDOW = pygame.display.set_mode((WIDTH, HEIGHT), pygame.DOUBLEBUF | pygame.SCALED, vsync=1)
+    pygame.display.set_caption("Ackerman Steering Simulator | Advanced Robotics")
+    # Preload the only image asset once at startup; every Car instance scales from this shared surface
+    CAR_IMAGE = pygame.image.load('car.png').convert_alpha()
+    return None
+
+
+# Degree/radian conversion factors (a plain multiply is cheaper than a function call in the per-frame paths)
+DEG2RAD = pi / 180
+RAD2DEG = 180 / pi
+TWO_PI = 2 * pi
+KMH_TO_MS = 1 / 3.6
 
 # Define colors
 BLACK = (0, 0, 0)
@@ -39,6 +65,94 @@ GREEN = (0, 255, 0)
 UPPER_SPEED_LIMIT = 300
 LOWER_SPEED_LIMIT = 0
 
+# Maximum render rate; when dt asks for a faster physics rate, several physics substeps run per rendered frame
+DISPLAY_FPS = 60
+
+# Bind the handful of keys the simulator cares about once, so the per-frame paths use plain module-level ints
+K_UP, K_DOWN, K_LEFT, K_RIGHT, K_F, K_S = pygame.K_UP, pygame.K_DOWN, pygame.K_LEFT, pygame.K_RIGHT, \
+    pygame.K_f, pygame.K_s
+
+# Dispatch table mapping the bitmask of pressed arrow keys (up=1, down=2, left=4, right=8) to the corresponding
+# Car.move action
+MOVE_TABLE = {0b0001: 'up',
+              0b0101: 'up_left',
+              0b1001: 'up_right',
+              0b0010: 'down',
+              0b0110: 'down_left',
+              0b1010: 'down_right'}
+
+# Numba is optional: when it is installed the kinematic kernel below gets compiled to native code, otherwise the
+# plain Python version is used
+try:
+    from numba import njit
+except ImportError:
+    def njit(**_kwargs):
+        def decorator(function):
+            return function
+        return decorator
+
+
+@njit(cache=True, fastmath=True)
+def ackermann_step(x_k_1, y_k_1, psi_k_1, tan_delta, beta, vel_kmh, dt, inv_l):
+    """
+    This function advances the Ackermann bicycle model by one sampling interval. It is kept free of any pygame or
+    class state so that Numba can compile it.
+    :param x_k_1: Previous x-coordinate [m].
+    :param y_k_1: Previous y-coordinate [m].
+    :param psi_k_1: Previous heading angle [rad].
+    :param tan_delta: Tangent of the front wheel rotation angle.
+    :param beta: Vehicle slip angle [rad].
+    :param vel_kmh: Vehicle speed [km/h].
+    :param dt: Sampling time interval [sec].
+    :param inv_l: Reciprocal of the wheelbase 1 / (lf + lb) [1/m].
+    :return: Tuple with the new (x, y, psi) state.
+    """
+    v_dt = vel_kmh * KMH_TO_MS * dt
+    # Going straight is the dominant case: beta is 0 and the heading does not change, so the extra trig for the
+    # heading update and the wrap can be skipped entirely
+    if tan_delta == 0:
+        x_k = x_k_1 + v_dt * cos(psi_k_1)
+        y_k = y_k_1 + v_dt * sin(psi_k_1)
+        return x_k, y_k, psi_k_1
+    angle = psi_k_1 + beta
+    x_k = x_k_1 + v_dt * cos(angle)
+    y_k = y_k_1 + v_dt * sin(angle)
+    psi = psi_k_1 + v_dt * cos(beta) * tan_delta * inv_l
+    # The heading moves by far less than a full turn per step, so wrapping with a compare and a subtraction is
+    # enough and avoids a float modulo every step
+    if psi >= TWO_PI:
+        psi -= TWO_PI
+    elif psi < 0:
+        psi += TWO_PI
+    return x_k, y_k, psi
+
+
+def ackermann_step_batch(x_k_1, y_k_1, psi_k_1, delta_deg, vel_kmh, dt, lf, lb):
+    """
+    This function advances a whole batch of Ackermann bicycle models by one sampling interval in a single
+    vectorized sweep. The interactive simulator only animates one car, so this is the entry point for fleet or
+    Monte-Carlo runs where a per-car Python loop would not scale.
+    :param x_k_1: Array with the previous x-coordinates [m].
+    :param y_k_1: Array with the previous y-coordinates [m].
+    :param psi_k_1: Array with the previous heading angles [rad].
+    :param delta_deg: Array with the front wheel rotation angles [°].
+    :param vel_kmh: Array with the vehicle speeds [km/h].
+    :param dt: Sampling time interval [sec].
+    :param lf: Distance from vehicle's center of mass to the front wheel axle [m].
+    :param lb: Distance from vehicle's center of mass to the back wheel axle [m].
+    :return: Tuple with the new (x, y, psi, beta) arrays.
+    """
+    # numpy is imported lazily so the interactive single-car simulator does not pay for it
+    import numpy as np
+    tan_delta = np.tan(delta_deg * DEG2RAD)
+    beta = np.arctan2(lb * tan_delta, lf + lb)
+    v_dt = vel_kmh * KMH_TO_MS * dt
+    angle = psi_k_1 + beta
+    x_k = x_k_1 + v_dt * np.cos(angle)
+    y_k = y_k_1 + v_dt * np.sin(angle)
+    psi = (psi_k_1 + v_dt * np.cos(beta) * tan_delta / (lf + lb)) % (2 * np.pi)
+    return x_k, y_k, psi, beta
+
 
 class Car:
     """
@@ -48,8 +162,17 @@ class Car:
     ANGLE_STEP = 1.2  # [°]
     SPEED_STEP = 10  # [km/h]
     METERS_PER_PIXEL = 2  # 1 px = 2 mts
-
-    def __init__(self, vehicle_speed, lf, lb, x0, y0, psi0, df0, dt):
+    # Table mapping each motion action to its (steering sign, velocity sign) pair
+    MOTION = {'up': (0, 1), 'up_left': (-1, 1), 'up_right': (1, 1),
+              'down': (0, -1), 'down_left': (1, -1), 'down_right': (-1, -1)}
+    # A fixed attribute layout makes the many per-frame attribute accesses cheaper than a __dict__ lookup
+    __slots__ = ('debug', 'vel', 'vel_k_1', 'lf', 'lb', 'x_k', 'x_k_1', 'y_k', 'y_k_1', 'psi', 'psi_k_1',
+                 'delta_k', 'delta_k_1', 'delta_t', 'image', 'width', 'height', 'x_center', 'y_center',
+                 'x_pos', 'y_pos', 'beta_k_1', 'trail_surface', '_base_image', '_rot_cache', '_dot',
+                 '_last_dot_pos', '_speed_pos', '_speed_surface', '_speed_rendered_vel', '_pos_cache',
+                 '_steer_cache', '_inv_l')
+
+    def __init__(self, vehicle_speed, lf, lb, x0, y0, psi0, df0, dt, debug=False):
         """
         This is the constructor. These variables come from the arguments specified in the terminal.
         :param vehicle_speed (int): Speed of the vehicle [km/h].
@@ -60,10 +183,14 @@ class Car:
         :param psi0 (float): Initial Heading Angle [°].
         :param df0 (float): Initial front wheel rotation angle [°].
         :param dt (float): Sampling time interval [sec].
+        :param debug (bool): Determines if the state is printed in the terminal on every step.
         """
+        self.debug = debug
         self.vel, self.vel_k_1 = vehicle_speed, 0  # 1 = 100 [km/h]
         self.lf = lf
         self.lb = lb
+        # Wheelbase reciprocal, precomputed so the step kernel multiplies instead of dividing
+        self._inv_l = 1 / (lf + lb)
         self.x_k, self.x_k_1 = x0, x0
         self.y_k, self.y_k_1 = y0, y0
         self.psi, self.psi_k_1 = psi0, psi0
@@ -73,10 +200,53 @@ class Car:
         self.image = None
         self.width = 40
         self.height = 20
+        # Window center, computed once instead of on every draw call
+        self.x_center = WIDTH // 2
+        self.y_center = HEIGHT // 2
+        # Scale the preloaded car image only once and precompute all 360 rotated copies up front (the sprite is
+        # tiny, so the memory cost is trivial); draw() then never touches the disk or transforms the image again
+        self._base_image = pygame.transform.scale(CAR_IMAGE, (self.width, self.height))
+        self._rot_cache = [pygame.transform.rotozoom(self._base_image, angle, 1.0) for angle in range(360)]
         self.x_pos = 0
         self.y_pos = 0
-        self.past_positions = []
         self.beta_k_1 = 0
+        # Persistent background surface holding the trail: every past position is drawn on it exactly once, so
+        # the per-frame cost stays constant no matter how long the simulation runs
+        self.trail_surface = pygame.Surface((WIDTH, HEIGHT)).convert()
+        self.trail_surface.fill(BLACK)
+        # Bake the static circle in the center of the screen (just for visualization) into the background
+        pygame.draw.circle(self.trail_surface, WHITE, (WIDTH // 2, HEIGHT // 2), 5)
+        # Pre-render the trail dot once; stamping a tiny surface is cheaper than rasterizing a circle each frame
+        self._dot = pygame.Surface((5, 5), pygame.SRCALPHA)
+        pygame.draw.circle(self._dot, SKY_BLUE, (2, 2), 2)
+        self._dot = self._dot.convert_alpha()
+        self._last_dot_pos = None
+        # Bake the parameter panel lines that never change into the background surface, so the per-frame
+        # background blit restores them for free; only the speed line (marked with None) still needs blitting
+        texts = ["CONFIG. PARAMS",
+                 None,
+                 f"\u0394T: {self.delta_t} s",
+                 f"\u0394f increment: {self.ANGLE_STEP} °",
+                 f"Lb: {self.lb} m",
+                 f"Lf: {self.lf} m"]
+        text_x, text_y = 20, 20
+        i = 0
+        for text in texts:
+            if text is None:
+                self._speed_pos = (text_x, text_y + i)
+            else:
+                self.trail_surface.blit(FONT.render(text, True, WHITE), (text_x, text_y + i))
+            # These lines are used to define the text location automatically
+            if i == 0:
+                i += 20
+            i += 15
+        self._speed_surface = None
+        self._speed_rendered_vel = None
+        # Cache of rendered position strings keyed by the quantized (x, y, psi) tuple
+        self._pos_cache = {}
+        # Cache of the steering-dependent terms (tan_delta, beta); the steering angle only ever takes multiples
+        # of ANGLE_STEP, so each value is computed exactly once
+        self._steer_cache = {}
 
     def draw(self, window):
         """
@@ -85,60 +255,42 @@ class Car:
         :return: None
         """
         # Set the position of the car with respect to the center of the window
-        self.x_pos = WIDTH // 2 + self.x_k / self.METERS_PER_PIXEL
-        self.y_pos = HEIGHT // 2 + self.y_k * -1 / self.METERS_PER_PIXEL
+        self.x_pos = self.x_center + self.x_k / self.METERS_PER_PIXEL
+        self.y_pos = self.y_center - self.y_k / self.METERS_PER_PIXEL
 
-        # Rotate the image with respect to the angle
-        self.image = pygame.transform.rotate(
-            pygame.transform.scale(pygame.image.load('car.png'), (self.width, self.height)), rad2deg(self.psi))
+        # Rotate the image with respect to the angle (quantized to 1°, a constant-time lookup in the cache)
+        self.image = self._rot_cache[int(self.psi * RAD2DEG) % 360]
 
-        # Leaving trail (save all past positions)
-        self.past_positions.append([self.x_pos, self.y_pos])
-        for point in self.past_positions:
-            pygame.draw.circle(window, SKY_BLUE, point, 2)
-            
-        # Draw circle in the center of the screen just for visualization
-        pygame.draw.circle(window, WHITE, (WIDTH//2, HEIGHT//2), 5)
+        # Leaving trail: stamp the pre-rendered dot on the trail surface and in the window, but only when the car
+        # actually moved since the last stamp (a stationary car would keep stamping the same pixel)
+        dot_pos = (self.x_pos - 2, self.y_pos - 2)
+        if dot_pos != self._last_dot_pos:
+            self.trail_surface.blit(self._dot, dot_pos)
+            window.blit(self._dot, dot_pos)
+            self._last_dot_pos = dot_pos
 
         # Display processed car image in the correct position and rotate with respect to the center of the image
         window.blit(self.image, self.image.get_rect(center=(self.x_pos, self.y_pos)))
         return None
 
-    def move(self, up=None, up_left=None, up_right=None, down=None, down_left=None, down_right=None, speed_up=None,
-             speed_down=None, not_moving=None):
+    def move(self, action=None, speed_up=None, speed_down=None, not_moving=None):
         """
         This method determines the direction and velocity in which the car is moving.
-        :param up: Determines if the car is moving forwards.
-        :param up_left: Determines if the car is moving forwards left with respect to the vehicle frame.
-        :param up_right: Determines if the car is moving forwards right with respect to the vehicle frame.
-        :param down: Determines if the car is moving backwards.
-        :param down_left: Determines if the car is moving backwards left with respect to the vehicle frame.
-        :param down_right: Determines if the car is moving backwards right with respect to the vehicle frame.
+        :param action: Motion action resolved from the pressed keys, one of the MOTION table keys.
         :param speed_up: Determines if the velocity increases.
         :param speed_down: Determines if the velocity decreases.
         :param not_moving: Determines if the car is not moving.
-        :return: 
+        :return:
         """
         self.vel_k_1 = self.vel
-        # Check every condition and move the car accordingly
-        if up:  # Forwards
-            self.delta_k = 0
-        if up_left:  # Forwards left
-            self.delta_k = self.ANGLE_STEP * -1
-        if up_right:  # Forwards right
-            self.delta_k = self.ANGLE_STEP
-        if down:  # Backwards
-            self.delta_k = 0
-            self.vel_k_1 *= -1
-        if down_left:  # Backwards left
-            self.delta_k = self.ANGLE_STEP
-            self.vel_k_1 *= -1
-        if down_right:  # Backwards right
-            self.delta_k = self.ANGLE_STEP * -1
-            self.vel_k_1 *= -1
+        # Resolve the action with a single table lookup instead of a branch cascade
+        if action is not None:
+            delta_sign, vel_sign = self.MOTION[action]
+            self.delta_k = delta_sign * self.ANGLE_STEP
+            self.vel_k_1 *= vel_sign
         if speed_up:  # Velocity increases
             self.vel += self.SPEED_STEP
-        if speed_down:  # Velocity increases
+        if speed_down:  # Velocity decreases
             self.vel -= self.SPEED_STEP
         if not_moving:  # Vehicle not moving
             self.vel_k_1 = 0
@@ -146,29 +298,32 @@ class Car:
 
     def print_parameters(self, window):
         """
-        This method prints the car parameters in the top left corner of the window.
+        This method prints the speed of the car in the parameter panel; the rest of the panel is static and
+        lives on the background surface.
         :param window: Pygame window object.
         :return: None.
         """
-        # Create list with the text to display
-        texts = ["CONFIG. PARAMS",
-                 f"Speed: {self.vel:.2f} km/h",
-                 f"\u0394T: {self.delta_t} s",
-                 f"\u0394f increment: {self.ANGLE_STEP} °",
-                 f"Lb: {self.lb} m",
-                 f"Lf: {self.lf} m"]
-        text_x, text_y = 20, 20
-        i = 0
-        # Display each item in the texts list
-        for text in texts:
-            text_rendered = FONT.render(text, True, WHITE)
-            window.blit(text_rendered, (text_x, text_y + i))
-            # These lines are used to define the text location automatically
-            if i == 0:
-                i += 20
-            i += 15
+        # Only the speed line needs drawing here: the static lines are baked into the background surface and
+        # were already restored by the background blit. Re-render it only when the speed changed
+        if self.vel != self._speed_rendered_vel:
+            self._speed_surface = FONT.render(f"Speed: {self.vel:.2f} km/h", True, WHITE)
+            self._speed_rendered_vel = self.vel
+        window.blit(self._speed_surface, self._speed_pos)
         return None
 
+    def _steering_terms(self, delta_deg):
+        """
+        This method returns the steering-dependent terms of the Ackermann equations, cached per steering angle.
+        :param delta_deg: Front wheel rotation angle [°].
+        :return: Tuple with (tan_delta, beta).
+        """
+        terms = self._steer_cache.get(delta_deg)
+        if terms is None:
+            tan_delta = tan(delta_deg * DEG2RAD)
+            terms = (tan_delta, atan2(self.lb * tan_delta, self.lf + self.lb))
+            self._steer_cache[delta_deg] = terms
+        return terms
+
     def apply_equations(self):
         """
         This method applies the Ackermann dynamic equations and also prints the beta, x, y and psi values in the
@@ -181,16 +336,18 @@ class Car:
         self.y_k_1 = self.y_k
         self.psi_k_1 = self.psi
 
-        # Ackermann dynamic equations
-        self.beta_k_1 = atan2((self.lb * tan(deg2rad(self.delta_k_1))), (self.lf + self.lb))
-        self.x_k = self.x_k_1 + self.vel_k_1/3.6 * self.delta_t * cos(self.psi_k_1 + self.beta_k_1)
-        self.y_k = self.y_k_1 + self.vel_k_1/3.6 * self.delta_t * sin(self.psi_k_1 + self.beta_k_1)
-        self.psi = (self.psi_k_1 + self.vel_k_1/3.6 * self.delta_t * cos(self.beta_k_1) * tan(
-            deg2rad(self.delta_k_1)) / (self.lf + self.lb)) % (2 * pi)
-
-        # Print the information in the terminal
-        print(f"Beta: {rad2deg(self.beta_k_1):.3f}°, x: {self.x_k:.3f} m, y: {self.y_k:.3f} m, "
-              f"heading_angle: {rad2deg(self.psi):.3f}°")
+        # Ackermann dynamic equations, computed in the (optionally Numba-compiled) kernel with the cached
+        # steering terms
+        tan_delta, self.beta_k_1 = self._steering_terms(self.delta_k_1)
+        self.x_k, self.y_k, self.psi = ackermann_step(
+            self.x_k_1, self.y_k_1, self.psi_k_1, tan_delta, self.beta_k_1, self.vel_k_1, self.delta_t,
+            self._inv_l)
+
+        # Print the information in the terminal (only when debugging: formatting and writing a line to stdout on
+        # every single step is expensive inside the frame loop)
+        if self.debug:
+            print(f"Beta: {self.beta_k_1 * RAD2DEG:.3f}°, x: {self.x_k:.3f} m, y: {self.y_k:.3f} m, "
+                  f"heading_angle: {self.psi * RAD2DEG:.3f}°")
         return None
 
     def print_position(self, window):
@@ -199,14 +356,62 @@ class Car:
         :param window: Pygame window object.
         :return: None
         """
-        self.apply_equations()
-        # Print the current x, y and psi of the vehicle after applying the equations
-        position_str = f"({self.x_k:.3f} m, {self.y_k:.3f} m, {(rad2deg(self.psi)):.3f} °)"
-        position_rendered = FONT.render(position_str, True, GREEN)
+        # Quantize the displayed values to sub-pixel significance so identical renders can be reused from the cache
+        key = (round(self.x_k, 1), round(self.y_k, 1), round(self.psi * RAD2DEG))
+        position_rendered = self._pos_cache.get(key)
+        if position_rendered is None:
+            # Print the current x, y and psi of the vehicle after applying the equations
+            position_str = f"({self.x_k:.3f} m, {self.y_k:.3f} m, {(self.psi * RAD2DEG):.3f} °)"
+            position_rendered = FONT.render(position_str, True, GREEN)
+            # Keep the cache bounded by evicting an arbitrary old entry
+            if len(self._pos_cache) >= 256:
+                self._pos_cache.popitem()
+            self._pos_cache[key] = position_rendered
         window.blit(position_rendered, (self.x_pos + 15, self.y_pos + 15))
         return None
 
 
+class Fleet:
+    """
+    This class holds the state of many cars in structure-of-arrays form and advances all of them at once with the
+    vectorized kernel. It is meant for headless fleet or Monte-Carlo runs; the interactive window only ever
+    animates a single Car.
+    """
+
+    def __init__(self, x0, y0, psi0, df0, vel, lf, lb, dt):
+        """
+        This is the constructor. All array arguments must share the same length (one entry per car).
+        :param x0: Array with the initial x-coordinates [m].
+        :param y0: Array with the initial y-coordinates [m].
+        :param psi0: Array with the initial heading angles [rad].
+        :param df0: Array with the initial front wheel rotation angles [°].
+        :param vel: Array with the vehicle speeds [km/h].
+        :param lf (float): Distance from vehicle's center of mass to the front wheel axle [m].
+        :param lb (float): Distance from vehicle's center of mass to the back wheel axle [m].
+        :param dt (float): Sampling time interval [sec].
+        """
+        # numpy is imported lazily so the interactive single-car simulator does not pay for it
+        import numpy as np
+        self.x = np.asarray(x0, dtype=float)
+        self.y = np.asarray(y0, dtype=float)
+        self.psi = np.asarray(psi0, dtype=float)
+        self.delta = np.asarray(df0, dtype=float)
+        self.vel = np.asarray(vel, dtype=float)
+        self.beta = np.zeros_like(self.x)
+        self.lf = lf
+        self.lb = lb
+        self.delta_t = dt
+
+    def step(self):
+        """
+        This method advances every car in the fleet by one sampling interval with a single vectorized sweep.
+        :return: None
+        """
+        self.x, self.y, self.psi, self.beta = ackermann_step_batch(
+            self.x, self.y, self.psi, self.delta, self.vel, self.delta_t, self.lf, self.lb)
+        return None
+
+
 def draw(window, car):
     """
     This function is used to update the pygame window with the background and all the car-related features.
@@ -214,50 +419,45 @@ def draw(window, car):
     :param car: Instance of the class Car.
     :return: None
     """
-    WINDOW.fill(BLACK)
+    # The trail surface acts as the background (and already holds the trail and the center circle), so a single
+    # blit restores the whole scene before the car and the texts are drawn on top
+    window.blit(car.trail_surface, (0, 0))
     car.draw(window)
     car.print_parameters(window)
     car.print_position(window)
-    pygame.display.update()
+    # With a double-buffered display a single flip presents the finished frame
+    pygame.display.flip()
     return None
 
 
 def handle_movement(car, keys):
     """
-    This function is used to handle the car movement with several conditionals that check which keys are being pressed
-    by the user.
+    This function is used to handle the car movement by resolving the pressed keys through the MOVE_TABLE dispatch
+    table.
     :param car: Instance of the class Car.
-    :param keys: A list containing all the keys that are being pressed.
+    :param keys: A dictionary containing the state of the relevant keys.
     :return: None
     """
-    # Check which keys are being pressed
-    moving = False
-    if keys[pygame.K_UP] or keys[pygame.K_DOWN] or keys[pygame.K_LEFT] or keys[pygame.K_RIGHT]:
-        moving = True
-    if keys[pygame.K_UP] and not (keys[pygame.K_DOWN] or keys[pygame.K_LEFT] or keys[pygame.K_RIGHT]):
-        car.move(up=True)
-    if keys[pygame.K_UP] and keys[pygame.K_LEFT] and not (keys[pygame.K_DOWN] or keys[pygame.K_RIGHT]):
-        car.move(up_left=True)
-    if keys[pygame.K_UP] and keys[pygame.K_RIGHT] and not (keys[pygame.K_DOWN] or keys[pygame.K_LEFT]):
-        car.move(up_right=True)
-    if keys[pygame.K_DOWN] and not (keys[pygame.K_UP] or keys[pygame.K_LEFT] or keys[pygame.K_RIGHT]):
-        car.move(down=True)
-    if keys[pygame.K_DOWN] and keys[pygame.K_LEFT] and not (keys[pygame.K_UP] or keys[pygame.K_RIGHT]):
-        car.move(down_left=True)
-    if keys[pygame.K_DOWN] and keys[pygame.K_RIGHT] and not (keys[pygame.K_UP] or keys[pygame.K_LEFT]):
-        car.move(down_right=True)
-    if keys[pygame.K_f] and car.vel < UPPER_SPEED_LIMIT and moving:
+    # Read each relevant key exactly once, pack the four direction bits into an integer and resolve the direction
+    # with a single table lookup
+    mask = keys[K_UP] | keys[K_DOWN] << 1 | keys[K_LEFT] << 2 | keys[K_RIGHT] << 3
+    moving = mask != 0
+    action = MOVE_TABLE.get(mask)
+    if action is not None:
+        car.move(action)
+    if keys[K_F] and car.vel < UPPER_SPEED_LIMIT and moving:
         car.move(speed_up=True)
-    if keys[pygame.K_s] and car.vel > LOWER_SPEED_LIMIT and moving:
+    if keys[K_S] and car.vel > LOWER_SPEED_LIMIT and moving:
         car.move(speed_down=True)
     if not moving:
         car.move(not_moving=True)
     return None
 
 
-def main(vehicle_speed, lf, lb, x0, y0, psi0, df0, dt):
+def main(vehicle_speed, lf, lb, x0, y0, psi0, df0, dt, debug=False):
     """
-    This function is the main loop of the simulation. Here the program is being limited to run every 1/dt seconds.
+    This function is the main loop of the simulation. The physics advances every dt seconds, while rendering is
+    capped at DISPLAY_FPS frames per second with as many physics substeps per frame as needed.
     :param vehicle_speed: Speed of the vehicle [km/h]. (float)
     :param lf: Distance from vehicle's center of mass to the front wheel axle [m]. (float)
     :param lb: Distance from vehicle's center of mass to the back wheel axle [m]. (float)
@@ -266,27 +466,54 @@ def main(vehicle_speed, lf, lb, x0, y0, psi0, df0, dt):
     :param psi0: Initial Heading Angle [°]. (float)
     :param df0: Initial front wheel rotation angle [°]. (float)
     :param dt: Sampling time interval [sec]. (float)
+    :param debug: Determines if the state is printed in the terminal on every step. (bool)
     :return: None
     """
+    _init_display()
     run = True
     clock = pygame.time.Clock()
-    # Define the maximum FPS for the simulation
-    fps = 1 / dt
+    # Decouple the physics rate (1/dt) from the render rate: render at most DISPLAY_FPS frames per second and
+    # run enough physics substeps per rendered frame to keep the simulated time correct
+    fps = min(1 / dt, DISPLAY_FPS)
+    substeps = max(1, round((1 / fps) / dt))
 
     # Create instance of the class Car with the parameters that the user introduced in the arguments
-    car = Car(vehicle_speed, lf, lb, x0, y0, psi0, df0, dt)
+    car = Car(vehicle_speed, lf, lb, x0, y0, psi0, df0, dt, debug)
+    # Keep the state of the keys we care about in a dictionary updated from KEYDOWN/KEYUP events, so the full
+    # keyboard array does not have to be rescanned with pygame.key.get_pressed() every frame
+    keys = {K_UP: False, K_DOWN: False, K_LEFT: False, K_RIGHT: False, K_F: False, K_S: False}
+    # Hoist the globals and bound methods used every frame into locals, so the hot loop avoids repeated
+    # LOAD_GLOBAL/LOAD_ATTR lookups
+    tick, wait, get_events = clock.tick, pygame.time.wait, pygame.event.get
+    quit_type, keydown, keyup = pygame.QUIT, pygame.KEYDOWN, pygame.KEYUP
+    idle_ms = int(1000 / fps)
+    needs_redraw = True
     while run:
-        clock.tick(fps)
-        # Draw in the window
-        draw(WINDOW, car)
-        # Check pressed keys and handle the movement
-        keys = pygame.key.get_pressed()
-        handle_movement(car, keys)
-        # Check if the user clicks the 'X' button in the window
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
+        pressing = any(keys.values())
+        if pressing:
+            tick(fps)
+        else:
+            # No key is being pressed: sleep through the frame budget with an OS wait instead of letting
+            # clock.tick spin near the deadline, so the idle loop stops burning a full core
+            wait(idle_ms)
+        # Step the physics and draw only when something can actually change on screen: while a key is held,
+        # while the car still carries velocity, and once at startup
+        if pressing or car.vel_k_1 != 0 or needs_redraw:
+            for _ in range(substeps):
+                car.apply_equations()
+            draw(WINDOW, car)
+            needs_redraw = False
+        # Check if the user clicks the 'X' button in the window or presses/releases a key
+        for event in get_events():
+            if event.type == quit_type:
                 run = False
                 break
+            if event.type == keydown and event.key in keys:
+                keys[event.key] = True
+            elif event.type == keyup and event.key in keys:
+                keys[event.key] = False
+        # Handle the movement with the tracked key states
+        handle_movement(car, keys)
     # If simulation closed, quit pygame
     pygame.quit()
 
@@ -302,6 +529,8 @@ if __name__ == '__main__':
     parser.add_argument('--psi0', type=float, help="Initial Heading Angle [°]")
     parser.add_argument('--df0', type=float, help="Initial front wheel rotation angle [°]")
     parser.add_argument('--dt', type=float, help="Sampling time interval [sec]")
+    parser.add_argument('--debug', action='store_true', help="Print the car state in the terminal on every step")
     args = parser.parse_args()
     # Call the main function and send the user-defined parameters
-    main(args.vehicle_speed, args.lf, args.lb, args.x0, args.y0, deg2rad(args.psi0), deg2rad(args.df0), args.dt)
+    main(args.vehicle_speed, args.lf, args.lb, args.x0, args.y0, args.psi0 * DEG2RAD, args.df0 * DEG2RAD, args.dt,
+         args.debug)